@@ -0,0 +1,617 @@
+#!/usr/bin/env python3
+
+"""
+Helix Track Core services test suite.
+
+Exercises the service registration API of the SQLite and the PostgreSQL
+backed instances and writes a JSON report with the results.
+"""
+
+import asyncio
+import logging
+import os
+import queue
+import ssl
+import sys
+import tempfile
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+import httpx
+import orjson
+
+from colorama import Fore, Style, init
+
+SQLITE_API_URL = os.getenv("SQLITE_API_URL", "http://localhost:8080")
+POSTGRES_API_URL = os.getenv("POSTGRES_API_URL", "http://localhost:8081")
+VERBOSE = os.getenv("VERBOSE", "true").lower() == "true"
+FAIL_FAST = os.getenv("FAIL_FAST", "false").lower() == "true"
+SERVICE_TIMEOUT = int(os.getenv("SERVICE_TIMEOUT", "60"))
+REPORT_PATH = os.getenv("REPORT_PATH", "test-results/services.json")
+
+# One TLS context for every client, so the session ticket cache is shared
+# across suites and re-runs resume TLS sessions instead of re-handshaking.
+_SSL_CONTEXT = ssl.create_default_context()
+
+# The suite is network bound, so every request goes through one shared client.
+# With an HTTP/2 capable server the sequential GETs and POSTs multiplex as
+# streams over a single connection instead of opening one connection each;
+# against HTTP/1.1 the client falls back to pooled keep-alive sockets. The
+# client is thread safe so the tests share it. No transport retries: their
+# uncapped exponential backoff would sleep far past any deadline on a down
+# service, and wait_for_service already handles reconnects within its own.
+SESSION = httpx.Client(
+    transport=httpx.HTTPTransport(
+        http2=True,
+        verify=_SSL_CONTEXT,
+        limits=httpx.Limits(max_keepalive_connections=16, max_connections=32),
+    ),
+    timeout=10.0,
+    headers={"Content-Type": "application/json"},
+)
+
+# The async client lives for the whole run on one background event loop, so
+# the concurrent tests of both suites draw from a single connection pool
+# (and DNS and TLS caches) instead of building and tearing one down each.
+_ASYNC_LOOP = asyncio.new_event_loop()
+threading.Thread(target=_ASYNC_LOOP.run_forever, daemon=True).start()
+ASYNC_SESSION = httpx.AsyncClient(
+    http2=True,
+    verify=_SSL_CONTEXT,
+    limits=httpx.Limits(max_keepalive_connections=16, max_connections=32),
+    timeout=10.0,
+    headers={"Content-Type": "application/json"},
+)
+
+
+def run_async(coroutine):
+    """
+    Run the coroutine on the shared background loop and wait for its result.
+    """
+
+    return asyncio.run_coroutine_threadsafe(coroutine, _ASYNC_LOOP).result()
+
+
+test_results = {
+    "timestamp": "",
+    "passed": 0,
+    "failed": 0,
+    "skipped": 0,
+    "tests": [],
+}
+
+# Both suites run concurrently and write into test_results, so every update
+# of the shared dict goes through this lock.
+_RESULTS_LOCK = threading.Lock()
+
+# The last successful health payload per URL, as (timestamp, json). The
+# health check test reuses the payload fetched by wait_for_service instead
+# of probing the endpoint again right away.
+_HEALTH_CACHE = {}
+_HEALTH_CACHE_LOCK = threading.Lock()
+_HEALTH_CACHE_TTL = 1.0
+
+# The registration bodies only vary by database type (and index, for the
+# concurrent test), so they are encoded once at import time and every call
+# reuses the ready bytes.
+_REG_BODIES = {
+    db_type: orjson.dumps(
+        {
+            "name": f"test-service-{db_type}",
+            "type": "worker",
+            "endpoint": f"http://test-service-{db_type}:9000",
+            "metadata": {"database": db_type, "suite": "core"},
+        }
+    )
+    for db_type in ("sqlite", "postgresql")
+}
+
+_CONC_BODIES = {
+    db_type: [
+        orjson.dumps(
+            {
+                "name": f"concurrent-service-{db_type}-{index}",
+                "type": "worker",
+                "endpoint": f"http://concurrent-service-{db_type}-{index}:9000",
+                "metadata": {"database": db_type, "suite": "core"},
+            }
+        )
+        for index in range(1, 6)
+    ]
+    for db_type in ("sqlite", "postgresql")
+}
+
+_INVALID_BODY = orjson.dumps({"name": ""})
+
+# Responses of the idempotent read endpoints (discovery, listing) are cached
+# briefly, mirroring the health cache, so looped or retried runs replay them
+# without touching the network. Any successful registration invalidates the
+# cache since it changes what those endpoints return.
+_GET_CACHE = {}
+_GET_CACHE_LOCK = threading.Lock()
+_GET_CACHE_TTL = 2.0
+
+
+# Color only when stdout is a real terminal. In CI the stream is a pipe and
+# colorama's wrapper would scan every write for escape codes just to strip
+# them again, so it is not installed at all there.
+if sys.stdout.isatty():
+    init(autoreset=True)
+    _RESET = Style.RESET_ALL
+    _COLORS = {
+        "INFO": Fore.CYAN,
+        "SUCCESS": Fore.GREEN,
+        "WARNING": Fore.YELLOW,
+        "ERROR": Fore.RED,
+    }
+else:
+    _RESET = ""
+    _COLORS = {}
+
+_LEVELS = {
+    "INFO": logging.INFO,
+    "SUCCESS": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+}
+
+# With the suites and tests running in parallel, writing to stdout directly
+# would serialize the callers on the stream lock and interleave lines.
+# Records are queued instead and a single listener thread formats and
+# writes them.
+_LOG_QUEUE = queue.Queue(-1)
+_LOGGER = logging.getLogger("helix.core.services")
+_LOGGER.setLevel(logging.INFO)
+_LOGGER.addHandler(QueueHandler(_LOG_QUEUE))
+_LOGGER.propagate = False
+
+
+class _ColorFormatter(logging.Formatter):
+    """
+    Format and color the queued records on the listener thread, keeping all
+    string work off the callers.
+    """
+
+    def format(self, record):
+
+        level = getattr(record, "suite_level", "INFO")
+        color = _COLORS.get(level, "")
+        timestamp = time.strftime(
+            "%Y-%m-%d %H:%M:%S", time.localtime(record.created)
+        )
+        return (
+            f"{color}[{timestamp}] [{level}] "
+            f"{record.getMessage()}{_RESET}"
+        )
+
+
+def start_log_listener():
+    """
+    Start the background thread that drains the log queue to stdout.
+    """
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(_ColorFormatter())
+    listener = QueueListener(_LOG_QUEUE, handler)
+    listener.start()
+    return listener
+
+
+def log(message, level="INFO"):
+    """
+    Queue the timestamped message colored according to the level.
+
+    Quiet runs only emit errors, and the message is not even formatted for
+    the suppressed levels.
+    """
+
+    if not VERBOSE and level != "ERROR":
+        return
+    _LOGGER.log(
+        _LEVELS.get(level, logging.INFO), message, extra={"suite_level": level}
+    )
+
+
+@dataclass(slots=True)
+class TestCase:
+    """
+    The outcome of a single test.
+    """
+
+    name: str
+    description: str
+    status: str = "pending"
+    message: str = ""
+    duration: float = 0.0
+    started: float = field(default_factory=time.perf_counter)
+
+    def _summary(self):
+
+        return {
+            "name": self.name,
+            "description": self.description,
+            "status": self.status,
+            "message": self.message,
+            "duration": round(self.duration, 3),
+        }
+
+    def pass_test(self, message=""):
+
+        self.status = "passed"
+        self.message = message
+        self.duration = time.perf_counter() - self.started
+        with _RESULTS_LOCK:
+            test_results["passed"] += 1
+            test_results["tests"].append(self._summary())
+        log(f"PASS: {self.description} {message}", "SUCCESS")
+
+    def fail_test(self, message=""):
+
+        self.status = "failed"
+        self.message = message
+        self.duration = time.perf_counter() - self.started
+        with _RESULTS_LOCK:
+            test_results["failed"] += 1
+            test_results["tests"].append(self._summary())
+        log(f"FAIL: {self.description} {message}", "ERROR")
+
+    def skip_test(self, message=""):
+
+        self.status = "skipped"
+        self.message = message
+        self.duration = time.perf_counter() - self.started
+        with _RESULTS_LOCK:
+            test_results["skipped"] += 1
+            test_results["tests"].append(self._summary())
+        log(f"SKIP: {self.description} {message}", "WARNING")
+
+
+def cached_get(url, params=None):
+    """
+    GET through the shared client, replaying a fresh cached response for the
+    idempotent read endpoints.
+    """
+
+    key = (url, tuple(sorted(params.items())) if params else None)
+    now = time.perf_counter()
+    with _GET_CACHE_LOCK:
+        entry = _GET_CACHE.get(key)
+        if entry is not None and now - entry[0] < _GET_CACHE_TTL:
+            return entry[1]
+    response = SESSION.get(url, params=params, timeout=10)
+    if response.status_code == 200:
+        with _GET_CACHE_LOCK:
+            _GET_CACHE[key] = (now, response)
+    return response
+
+
+def invalidate_get_cache():
+    """
+    Drop the cached read responses after a write made them stale.
+    """
+
+    with _GET_CACHE_LOCK:
+        _GET_CACHE.clear()
+
+
+def wait_for_service(health_url, timeout=SERVICE_TIMEOUT):
+    """
+    Wait for the health endpoint to answer 200, retrying reconnects and
+    unhealthy responses with a capped exponential backoff until the
+    deadline expires.
+    """
+
+    log(f"Waiting for the service at {health_url}")
+    start = time.perf_counter()
+    delay = 0.1
+    while True:
+        try:
+            # A short per-probe timeout keeps the deadline check responsive;
+            # the client-wide 10s would let one black-holed probe overshoot
+            # the deadline by that much.
+            response = SESSION.get(health_url, timeout=2)
+            if response.status_code == 200:
+                # A 200 with an undecodable body (a warming-up service or an
+                # interposed proxy page) counts as not ready yet.
+                payload = orjson.loads(response.content)
+                with _HEALTH_CACHE_LOCK:
+                    _HEALTH_CACHE[health_url] = (time.perf_counter(), payload)
+                log(f"The service at {health_url} is ready", "SUCCESS")
+                return True
+        except (httpx.HTTPError, orjson.JSONDecodeError):
+            pass
+        if time.perf_counter() - start >= timeout:
+            break
+        time.sleep(delay)
+        delay = min(delay * 2, 1.0)
+    log(f"The service at {health_url} did not become ready in {timeout}s", "ERROR")
+    return False
+
+
+def test_health_check(endpoints, db_type):
+
+    test = TestCase("health_check", f"Health check ({db_type})")
+    with _HEALTH_CACHE_LOCK:
+        cached = _HEALTH_CACHE.get(endpoints["health"])
+    if cached is not None and time.perf_counter() - cached[0] < _HEALTH_CACHE_TTL:
+        data = cached[1]
+        if data.get("status") == "healthy":
+            test.pass_test(f"database: {data.get('database', 'unknown')}")
+        else:
+            test.fail_test(f"Unexpected status: {data.get('status')}")
+        return test
+    try:
+        response = SESSION.get(endpoints["health"], timeout=10)
+        if response.status_code == 200:
+            data = orjson.loads(response.content)
+            if data.get("status") == "healthy":
+                test.pass_test(f"database: {data.get('database', 'unknown')}")
+            else:
+                test.fail_test(f"Unexpected status: {data.get('status')}")
+        else:
+            test.fail_test(f"HTTP {response.status_code}: {response.text[:200]}")
+    except (httpx.HTTPError, orjson.JSONDecodeError) as error:
+        test.fail_test(str(error))
+    return test
+
+
+def test_service_registration(endpoints, db_type):
+
+    test = TestCase("service_registration", f"Service registration ({db_type})")
+    try:
+        response = SESSION.post(
+            endpoints["register"], content=_REG_BODIES[db_type], timeout=10
+        )
+        if response.status_code == 201:
+            invalidate_get_cache()
+            data = orjson.loads(response.content)
+            if data.get("id"):
+                test.pass_test(f"registered as {data['id']}")
+            else:
+                test.fail_test("The registration response carries no service id")
+        else:
+            test.fail_test(f"HTTP {response.status_code}: {response.text[:200]}")
+    except (httpx.HTTPError, orjson.JSONDecodeError) as error:
+        test.fail_test(str(error))
+    return test
+
+
+def test_service_discovery(endpoints, db_type):
+
+    test = TestCase("service_discovery", f"Service discovery ({db_type})")
+    try:
+        response = cached_get(
+            endpoints["discover"], params={"name": f"test-service-{db_type}"}
+        )
+        if response.status_code == 200:
+            data = orjson.loads(response.content)
+            if data.get("name") == f"test-service-{db_type}":
+                test.pass_test(f"resolved to {data.get('endpoint')}")
+            else:
+                test.fail_test(f"Discovered the wrong service: {data.get('name')}")
+        else:
+            test.fail_test(f"HTTP {response.status_code}: {response.text[:200]}")
+    except (httpx.HTTPError, orjson.JSONDecodeError) as error:
+        test.fail_test(str(error))
+    return test
+
+
+def test_service_list(endpoints, db_type):
+
+    test = TestCase("service_list", f"Service list ({db_type})")
+    try:
+        response = cached_get(endpoints["list"])
+        if response.status_code == 200:
+            data = orjson.loads(response.content)
+            services = data.get("services", [])
+            if any(s.get("name") == f"test-service-{db_type}" for s in services):
+                test.pass_test(f"{len(services)} services listed")
+            else:
+                test.fail_test("The registered service is missing from the list")
+        else:
+            test.fail_test(f"HTTP {response.status_code}: {response.text[:200]}")
+    except (httpx.HTTPError, orjson.JSONDecodeError) as error:
+        test.fail_test(str(error))
+    return test
+
+
+def test_invalid_registration(endpoints, db_type):
+
+    test = TestCase("invalid_registration", f"Invalid registration ({db_type})")
+    try:
+        response = SESSION.post(
+            endpoints["register"], content=_INVALID_BODY, timeout=10
+        )
+        if response.status_code == 400:
+            test.pass_test("rejected with HTTP 400")
+        else:
+            test.fail_test(f"Expected HTTP 400, got {response.status_code}")
+    except httpx.HTTPError as error:
+        test.fail_test(str(error))
+    return test
+
+
+async def register_service(session, endpoints, db_type, index):
+    """
+    Register one of the concurrent test services on the shared event loop.
+    """
+
+    try:
+        response = await session.post(
+            endpoints["register"], content=_CONC_BODIES[db_type][index - 1]
+        )
+        if response.status_code == 201:
+            invalidate_get_cache()
+            return True
+        return False
+    except httpx.HTTPError:
+        return False
+
+
+def test_concurrent_registrations(endpoints, db_type):
+
+    test = TestCase(
+        "concurrent_registrations", f"Concurrent registrations ({db_type})"
+    )
+
+    # All five registrations run on the shared event loop and, over HTTP/2,
+    # multiplex as streams on a single connection with zero extra handshakes.
+    async def _run():
+        return await asyncio.gather(
+            *[
+                register_service(ASYNC_SESSION, endpoints, db_type, index)
+                for index in range(1, 6)
+            ]
+        )
+
+    results = run_async(_run())
+    if all(results):
+        test.pass_test("5/5 registrations succeeded")
+    else:
+        test.fail_test(f"{results.count(True)}/5 registrations succeeded")
+    return test
+
+
+_SUITE_TESTS = (
+    ("health_check", "Health check"),
+    ("service_registration", "Service registration"),
+    ("service_discovery", "Service discovery"),
+    ("service_list", "Service list"),
+    ("invalid_registration", "Invalid registration"),
+    ("concurrent_registrations", "Concurrent registrations"),
+)
+
+
+def skip_suite(db_type, reason):
+    """
+    Mark every test of the suite as skipped without touching the network.
+    """
+
+    tests = []
+    for name, description in _SUITE_TESTS:
+        test = TestCase(name, f"{description} ({db_type})")
+        test.skip_test(reason)
+        tests.append(test)
+    return tests
+
+
+def run_test_suite(api_url, db_type):
+    """
+    Run every test against the given instance and record the outcomes.
+    """
+
+    log(f"Running the {db_type} test suite against {api_url}")
+
+    # Every endpoint URL is built exactly once per suite; the tests and the
+    # concurrent sub-requests reuse the frozen strings.
+    endpoints = {
+        "health": f"{api_url}/health",
+        "register": f"{api_url}/api/services/register",
+        "discover": f"{api_url}/api/services/discover",
+        "list": f"{api_url}/api/services/list",
+    }
+    if not wait_for_service(endpoints["health"]):
+        tests = skip_suite(db_type, "The service never became ready")
+    else:
+        # Discovery and the list test expect the registered service, so the
+        # registration runs first; the rest have no ordering dependency and
+        # run concurrently, bounding the suite by its slowest test.
+        registration = test_service_registration(endpoints, db_type)
+        independent = [
+            test_health_check,
+            test_service_discovery,
+            test_service_list,
+            test_invalid_registration,
+            test_concurrent_registrations,
+        ]
+        with ThreadPoolExecutor(max_workers=len(independent)) as executor:
+            outcomes = list(
+                executor.map(
+                    lambda test_fn: test_fn(endpoints, db_type), independent
+                )
+            )
+        tests = [registration] + outcomes
+    return tests
+
+
+def generate_report():
+    """
+    Write the collected results as a JSON report.
+    """
+
+    test_results["timestamp"] = datetime.now().isoformat()
+    # A bare filename has an empty dirname, which both makedirs and mkstemp
+    # reject; treat it as the current directory.
+    directory = os.path.dirname(REPORT_PATH) or "."
+    if directory != ".":
+        os.makedirs(directory, exist_ok=True)
+
+    # The report lands under its final name atomically, so a concurrent
+    # reader never observes a partially written file.
+    descriptor, staging_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(descriptor, "wb") as report_file:
+        report_file.write(orjson.dumps(test_results, option=orjson.OPT_INDENT_2))
+    # mkstemp creates the file owner-only; open the report up to the usual
+    # world-readable mode so artifact collectors can pick it up.
+    os.chmod(staging_path, 0o644)
+    os.replace(staging_path, REPORT_PATH)
+    log(f"The report is written to {REPORT_PATH}")
+
+
+def main():
+
+    start = time.perf_counter()
+    listener = start_log_listener()
+    log("Helix Track Core services test suite")
+
+    # The two backends are independent services, so their suites overlap
+    # their network waits instead of running back to back.
+    async def _run_suites():
+        return await asyncio.gather(
+            asyncio.to_thread(run_test_suite, SQLITE_API_URL, "sqlite"),
+            asyncio.to_thread(run_test_suite, POSTGRES_API_URL, "postgresql"),
+        )
+
+    if FAIL_FAST:
+        # Sequential on purpose: an unreachable first backend usually means
+        # the infrastructure is down, so do not spend another readiness
+        # timeout on the second one.
+        sqlite_tests = run_test_suite(SQLITE_API_URL, "sqlite")
+        if all(test.status == "skipped" for test in sqlite_tests):
+            log(
+                "Skipping the postgresql suite: "
+                "the sqlite service is unreachable",
+                "WARNING",
+            )
+            skip_suite(
+                "postgresql",
+                "Skipped by FAIL_FAST: the sqlite service is unreachable",
+            )
+        else:
+            run_test_suite(POSTGRES_API_URL, "postgresql")
+    else:
+        asyncio.run(_run_suites())
+    generate_report()
+    total = (
+        test_results["passed"] + test_results["failed"] + test_results["skipped"]
+    )
+    status = "SUCCESS" if test_results["failed"] == 0 else "ERROR"
+    log(
+        f"{test_results['passed']}/{total} tests passed "
+        f"in {time.perf_counter() - start:.1f}s",
+        status,
+    )
+    run_async(ASYNC_SESSION.aclose())
+    _ASYNC_LOOP.call_soon_threadsafe(_ASYNC_LOOP.stop)
+    SESSION.close()
+    listener.stop()
+    return 0 if test_results["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())